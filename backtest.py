@@ -1,156 +1,790 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import shutil
 import pandas as pd
-import tkinter as tk
-from tkinter import ttk, messagebox
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import time
+import random
 import numpy as np
-import math
+import asyncio
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp가 없으면 스레드 풀 경로로 다운로드
+    aiohttp = None
+
+import json
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson이 없으면 표준 json으로 파싱
+    _loads = json.loads
+
+try:
+    import numexpr
+except ImportError:  # numexpr가 없으면 NumPy 연산으로 계산
+    numexpr = None
+
+# numba는 분포 계산에만 쓰이므로 _load_kernels에서 처음 필요할 때 import한다
+numba = None
+_bin_counts = None
+_minmax = None
+
+# 다운로드 스레드들이 함께 쓰는 세션 (TCP/TLS 연결 재사용)
+# 429는 _limiter/_backoff_delay가 처리하므로 여기서는 일시적인 서버 오류만 재시도한다
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], raise_on_status=False),
+))
+REQUEST_TIMEOUT = (3, 10)  # (connect, read) 초
+MAX_WORKERS = 8
+ASYNC_CONCURRENCY = 10
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+# 코인 목록은 하루에 한 번 정도만 바뀌므로 TTL 동안 재사용한다
+COIN_LIST_TTL = 3600
+COIN_DATA_CACHE_SIZE = 256
+# 추가 저장으로 조각 파일이 이만큼 쌓이면 하나로 합친다
+MAX_PARTS = 64
+# 업비트 가격/거래량은 float32로 충분하다 (timestamp는 ms 단위라 int64 유지)
+FLOAT32_COLUMNS = {
+    col: 'float32' for col in (
+        'opening_price', 'high_price', 'low_price', 'trade_price', 'prev_closing_price',
+        'change_price', 'change_rate', 'candle_acc_trade_price', 'candle_acc_trade_volume',
+        'return', 'log_return',
+    )
+}
+# 일봉 캔들 응답의 컬럼별 타입 (candle_date_time_kst는 ISO 문자열을 바로 datetime64로 변환)
+CANDLE_SCHEMA = {
+    'market': object,
+    'candle_date_time_utc': object,
+    'candle_date_time_kst': 'datetime64[ns]',
+    'timestamp': np.int64,
+    **FLOAT32_COLUMNS,
+}
+_cache_lock = threading.Lock()
+_coin_list_cache = None  # (fetched_at, coins)
+_coin_data_cache = {}  # file_name -> (mtime_ns, DataFrame)
+
+# 업데이트 때 전체 데이터를 읽지 않도록 코인별 마지막 캔들(시각, 종가)을 따로 기록한다
+LAST_DATES_FILE = "last_dates.json"
+_last_dates_lock = threading.Lock()
+_last_dates = None  # market -> {'date': ISO 시각, 'price': 종가}
+
+class RateLimiter:
+    """Token bucket shared by every request, sync or async.
+
+    Each caller reserves a token up front and sleeps until its slot, so
+    concurrent workers are spread out instead of bursting into a 429.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take one token and return how long to wait before it becomes valid."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def __enter__(self):
+        time.sleep(self._reserve())
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def __aenter__(self):
+        await asyncio.sleep(self._reserve())
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+# 업비트 시세 조회 API 요청 제한: IP당 초당 10회
+_limiter = RateLimiter(rate=10, burst=10)
+
+def _backoff_delay(headers, attempt):
+    """Seconds to wait after a 429: Retry-After if given, else full-jitter exponential backoff."""
+    retry_after = headers.get('Retry-After')
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
 
 def fetch_coin_list():
     """Fetch the list of all available coins in the KRW market from Upbit."""
+    with _cache_lock:
+        cached = _coin_list_cache
+    if cached is not None and time.monotonic() - cached[0] < COIN_LIST_TTL:
+        return list(cached[1])
+
     url = "https://api.upbit.com/v1/market/all"
-    response = requests.get(url)
+    with _limiter:
+        response = _session.get(url, timeout=REQUEST_TIMEOUT)
     if response.status_code == 200:
-        data = response.json()
+        data = _loads(response.content)
         krw_coins = [coin['market'] + ' (' + coin['korean_name'] + ')' for coin in data if coin['market'].startswith('KRW')]
+        _store_coin_list(krw_coins)
         return krw_coins
     else:
         print(f"Failed to fetch coin list. Status code: {response.status_code}")
         return []
 
-def fetch_historical_data(coin, count=200, to=None):
-    """Fetch historical daily candlestick data for a specific coin from Upbit."""
-    url = f"https://api.upbit.com/v1/candles/days?market={coin.split(' ')[0]}&count={count}"
+def _store_coin_list(coins):
+    global _coin_list_cache
+    with _cache_lock:
+        _coin_list_cache = (time.monotonic(), list(coins))
+
+def _market(coin):
+    return coin.split(' ')[0]
+
+def _candles_url(coin, count=200, to=None):
+    url = f"https://api.upbit.com/v1/candles/days?market={_market(coin)}&count={count}"
     if to:
         url += f"&to={to}"
+    return url
+
+def _parse_candles(coin, data):
+    """Convert an Upbit candle response into a DataFrame sorted oldest-first.
+
+    The list of row dicts is pivoted into one typed array per column, so
+    pandas does not have to infer the schema row by row.
+    """
+    if not data:
+        print(f"No data returned for {coin}.")
+        return pd.DataFrame()
+
+    rows = data[::-1]  # 업비트는 최신순으로 반환한다
+    columns = {
+        key: np.fromiter((row.get(key) for row in rows), dtype=CANDLE_SCHEMA.get(key, object), count=len(rows))
+        for key in rows[0]
+    }
+    return pd.DataFrame(columns)
 
-    retries = 3
-    while retries > 0:
-        response = requests.get(url)
+def fetch_historical_data(coin, count=200, to=None):
+    """Fetch historical daily candlestick data for a specific coin from Upbit.
+
+    Returns None when the request failed (non-200 or retries exhausted);
+    an empty DataFrame means Upbit answered but has no candles.
+    """
+    url = _candles_url(coin, count, to)
+
+    for attempt in range(MAX_RETRIES):
+        with _limiter:
+            response = _session.get(url, timeout=REQUEST_TIMEOUT)
         if response.status_code == 200:
-            data = response.json()
-            df = pd.DataFrame(data)
-            if not df.empty:
-                df['candle_date_time_kst'] = pd.to_datetime(df['candle_date_time_kst'])
-                return df[::-1]
-            else:
-                print(f"No data returned for {coin}.")
-                return pd.DataFrame()
+            return _parse_candles(coin, _loads(response.content))
         elif response.status_code == 429:
             print(f"Rate limit exceeded for {coin}. Retrying after a short delay.")
-            time.sleep(10)
-            retries -= 1
+            time.sleep(_backoff_delay(response.headers, attempt))
         else:
             print(f"Failed to fetch data for {coin}. Status code: {response.status_code}")
-            return pd.DataFrame()
+            return None
+    return None
+
+async def _fetch_candles(session, coin, count=200, to=None):
+    """Async counterpart of fetch_historical_data used by the bulk download."""
+    url = _candles_url(coin, count, to)
+
+    for attempt in range(MAX_RETRIES):
+        async with _limiter:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return _parse_candles(coin, _loads(await response.read()))
+                status = response.status
+                headers = response.headers
+        if status == 429:
+            print(f"Rate limit exceeded for {coin}. Retrying after a short delay.")
+            await asyncio.sleep(_backoff_delay(headers, attempt))
+        else:
+            print(f"Failed to fetch data for {coin}. Status code: {status}")
+            return None
+    return None
+
+def _data_file(coin):
+    """Parquet dataset directory holding one part file per save/append."""
+    return f"{_market(coin)}_data.parquet"
+
+def _part_files(dataset_dir):
+    # 조각 파일 이름은 첫 캔들 날짜로 시작하므로 이름순 = 시간순
+    return sorted(f for f in os.listdir(dataset_dir) if f.endswith('.parquet'))
+
+def _part_name(df):
+    first = df['candle_date_time_kst'].iloc[0]
+    last = df['candle_date_time_kst'].iloc[-1]
+    return f"part-{first:%Y%m%d}-{last:%Y%m%d}.parquet"
+
+def _downcast(df):
+    return df.astype({col: dt for col, dt in FLOAT32_COLUMNS.items() if col in df.columns})
+
+def _pct_change(prices, prev):
+    """100 * (prices / prev - 1), fused into a single pass by numexpr when it is installed."""
+    if numexpr is not None:
+        return numexpr.evaluate("100 * (prices / prev - 1)", local_dict={'prices': prices, 'prev': prev})
+    return (prices / prev - 1) * 100
+
+def _with_returns(df, prev_price=None):
+    """Add the 'return'/'log_return' columns; prev_price is the close before df's first row."""
+    prices = df['trade_price'].to_numpy()
+    prev = np.empty_like(prices)
+    prev[:1] = np.nan if prev_price is None else prev_price
+    prev[1:] = prices[:-1]
+    returns = _pct_change(prices, prev)
+    return df.assign(**{'return': returns, 'log_return': np.log1p(returns / 100)})
+
+def _read_coin_file(file_name):
+    if file_name.endswith('.parquet'):
+        df = pd.read_parquet(file_name, engine="pyarrow")
+        if not df['candle_date_time_kst'].is_monotonic_increasing:
+            df = df.sort_values('candle_date_time_kst', ignore_index=True)
+        return df
+    return pd.read_csv(file_name, dtype=FLOAT32_COLUMNS, parse_dates=['candle_date_time_kst'])
+
+def _load_cached(file_name):
+    """Read file_name, reusing the last result while the file is unchanged.
+
+    The returned frame is shared with the cache; treat it as read-only.
+    """
+    mtime = os.stat(file_name).st_mtime_ns
+    with _cache_lock:
+        cached = _coin_data_cache.get(file_name)
+    if cached is None or cached[0] != mtime:
+        df = _read_coin_file(file_name)
+        with _cache_lock:
+            _coin_data_cache.pop(file_name, None)
+            _coin_data_cache[file_name] = (mtime, df)
+            while len(_coin_data_cache) > COIN_DATA_CACHE_SIZE:
+                del _coin_data_cache[next(iter(_coin_data_cache))]
+        cached = (mtime, df)
+    # 캐시된 원본을 그대로 돌려주므로 호출하는 쪽에서 제자리 수정하면 안 된다
+    return cached[1]
+
+def _invalidate(file_name):
+    with _cache_lock:
+        _coin_data_cache.pop(file_name, None)
 
 def load_coin_data(coin):
-    """Load historical data from CSV."""
-    file_name = f"{coin.split(' ')[0]}_data.csv"
+    """Load historical data from the coin's Parquet dataset."""
+    file_name = _data_file(coin)
+    _restore_interrupted_save(file_name)
     if os.path.exists(file_name):
-        df = pd.read_csv(file_name)
-        df['candle_date_time_kst'] = pd.to_datetime(df['candle_date_time_kst'])
-        return df
-    else:
-        print(f"No saved data found for {coin}.")
-        return pd.DataFrame()
-
-def save_coin_data(coin, df):
-    """Save historical data for a coin to a CSV file."""
-    file_name = f"{coin.split(' ')[0]}_data.csv"
-    df.to_csv(file_name, index=False)
-
-def update_all_coins():
-    """모든 코인의 데이터를 다운로드 및 업데이트하는 함수"""
-    coins = fetch_coin_list()
-    for coin in coins:
-        print(f"Updating {coin}...")
+        return _load_cached(file_name)
+
+    # 이전 버전에서 저장한 CSV 파일도 읽는다 (다음 저장 시 Parquet으로 변환됨)
+    legacy_file = f"{_market(coin)}_data.csv"
+    if os.path.exists(legacy_file):
+        return _load_cached(legacy_file)
+
+    print(f"No saved data found for {coin}.")
+    return pd.DataFrame()
+
+def _write_part(dataset_dir, df):
+    """Write df as a part file under a hidden temp name, then rename it into place."""
+    path = os.path.join(dataset_dir, _part_name(df))
+    # '.'으로 시작하는 파일은 pyarrow가 읽지 않으므로 쓰다가 중단돼도 데이터셋이 깨지지 않는다
+    tmp_path = os.path.join(dataset_dir, '.' + _part_name(df) + '.tmp')
+    df.to_parquet(tmp_path, engine="pyarrow", compression="zstd", index=False)
+    os.replace(tmp_path, path)
+
+def _remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def _restore_interrupted_save(dataset_dir):
+    """Finish a save_coin_data swap that was interrupted between its two renames."""
+    old_path = dataset_dir + '.old'
+    new_dir = dataset_dir + '.new'
+    if not os.path.exists(dataset_dir) and os.path.exists(old_path) and os.path.isdir(new_dir):
+        # .old가 생긴 시점에는 .new가 이미 완성되어 있다
+        os.replace(new_dir, dataset_dir)
+    if os.path.exists(dataset_dir):
+        _remove_path(old_path)
+
+def save_coin_data(coin, df, recompute=True):
+    """Rewrite the coin's whole history as a single Parquet part, with its daily returns.
+
+    With recompute=False, an existing 'return'/'log_return' column is kept
+    as is (e.g. the NaN stored after a gap) instead of being rebuilt.
+
+    The new dataset is built next to the old one and swapped in, so a
+    copy of the history exists at every point even if the process dies.
+    """
+    dataset_dir = _data_file(coin)
+    new_dir = dataset_dir + '.new'
+    old_path = dataset_dir + '.old'
+    df = _downcast(df.reset_index(drop=True))
+    if recompute or 'return' not in df.columns:
+        df = _with_returns(df)
+
+    _restore_interrupted_save(dataset_dir)
+    _remove_path(new_dir)
+    os.makedirs(new_dir)
+    _write_part(new_dir, df)
+
+    if os.path.exists(dataset_dir):  # 이전 형식의 단일 Parquet 파일일 수도 있다
+        os.replace(dataset_dir, old_path)
+    os.replace(new_dir, dataset_dir)
+    _remove_path(old_path)
+    _invalidate(dataset_dir)
+    _record_last_row(coin, df)
+
+def append_coin_data(coin, new_data, prev_price):
+    """Write only the new candles as an extra part file; O(new rows) regardless of history length."""
+    dataset_dir = _data_file(coin)
+    df = _with_returns(_downcast(new_data.reset_index(drop=True)), prev_price)
+    _write_part(dataset_dir, df)
+    _invalidate(dataset_dir)
+    _record_last_row(coin, df)
+
+    if len(_part_files(dataset_dir)) > MAX_PARTS:
+        # 저장된 수익률(빠진 구간 뒤의 NaN 포함)을 그대로 유지하며 합친다
+        save_coin_data(coin, load_coin_data(coin), recompute=False)
+
+def _reload_last_dates():
+    """Re-read LAST_DATES_FILE; another process (e.g. --update) may have changed it."""
+    global _last_dates
+    try:
+        with open(LAST_DATES_FILE, 'rb') as f:
+            last_dates = _loads(f.read())
+    except (OSError, ValueError):
+        last_dates = {}
+    with _last_dates_lock:
+        _last_dates = last_dates
+
+def _record_last_row(coin, df):
+    """Remember df's last candle for coin and atomically rewrite LAST_DATES_FILE."""
+    last = df.iloc[-1]
+    entry = {'date': last['candle_date_time_kst'].isoformat(), 'price': float(last['trade_price'])}
+    if _last_dates is None:
+        _reload_last_dates()
+    with _last_dates_lock:
+        _last_dates[_market(coin)] = entry
+        tmp_file = LAST_DATES_FILE + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(_last_dates, f)
+        os.replace(tmp_file, LAST_DATES_FILE)
+
+def _last_saved_row(coin):
+    """Return (last_date, last_price) of the saved history, or None when nothing is saved.
+
+    Uses LAST_DATES_FILE when its entry matches the newest part's file
+    name; otherwise only the newest part file is read, so this never
+    loads the whole history.
+    """
+    dataset_dir = _data_file(coin)
+    _restore_interrupted_save(dataset_dir)
+    if os.path.isdir(dataset_dir):
+        if _last_dates is None:
+            _reload_last_dates()
+        with _last_dates_lock:
+            entry = _last_dates.get(_market(coin))
+
+        parts = _part_files(dataset_dir)
+        if parts:
+            # 파트를 쓴 뒤 기록 전에 중단됐으면 항목이 낡았으므로 최신 파트 이름의 마지막 날짜와 맞춰 본다
+            if entry is not None:
+                last_date = pd.Timestamp(entry['date'])
+                if parts[-1].endswith(f"-{last_date:%Y%m%d}.parquet"):
+                    return last_date, entry['price']
+            last = pd.read_parquet(os.path.join(dataset_dir, parts[-1]), engine="pyarrow",
+                                   columns=['candle_date_time_kst', 'trade_price']).iloc[-1]
+            return last['candle_date_time_kst'], last['trade_price']
+    return None
+
+def _newer_than(df, last_date):
+    """Rows of the date-sorted df strictly after last_date, found by binary search."""
+    dates = df['candle_date_time_kst'].to_numpy()
+    return df.iloc[np.searchsorted(dates, np.datetime64(last_date), side='right'):]
+
+def _closed_candles(df):
+    """Drop the newest day candle while it is still open (it closes at 09:00 KST the next day)."""
+    now_kst = pd.Timestamp.now(tz='Asia/Seoul').tz_localize(None)
+    dates = df['candle_date_time_kst'].to_numpy()
+    return df.iloc[:np.searchsorted(dates, np.datetime64(now_kst - pd.Timedelta(days=1)), side='right')]
+
+def _fetch_back_to(coin, new_data, last_date):
+    """Page backwards with 'to' until new_data reaches last_date.
+
+    Returns (data, complete); complete is False when Upbit answered with
+    no candles before reaching last_date, i.e. the gap is real. data is
+    None when a page request failed, so the caller can retry later.
+    """
+    pages = [new_data]
+    oldest = new_data['candle_date_time_kst'].iloc[0]
+    while oldest > last_date:
+        # 'to'는 UTC 기준이며 해당 시각 이전의 캔들을 반환한다
+        to = (oldest - pd.Timedelta(hours=9)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        page = fetch_historical_data(coin, to=to)
+        if page is None:
+            return None, False
+        if page.empty:
+            return pd.concat(pages[::-1], ignore_index=True), False
+        pages.append(page)
+        oldest = page['candle_date_time_kst'].iloc[0]
+    return pd.concat(pages[::-1], ignore_index=True), True
+
+def _merge_new_data(coin, new_data):
+    """Save the closed candles newer than the saved history."""
+    # 요청이 실패했으면 아무것도 저장하지 않는다 (다음 실행에서 같은 날짜부터 다시 받는다)
+    if new_data is None:
+        return f"Failed to fetch data for {coin}; try again later."
+    # _parse_candles는 비어 있지 않으면 항상 candle_date_time_kst 컬럼을 포함한다
+    if new_data.empty:
+        return f"No new data for {coin}."
+
+    last_row = _last_saved_row(coin)
+    if last_row is None:
         existing_data = load_coin_data(coin)
-
         if existing_data.empty:
-            print(f"Fetching all available data for {coin}.")
-            new_data = fetch_historical_data(coin)
-        else:
-            last_date = existing_data['candle_date_time_kst'].max()
-            new_data = fetch_historical_data(coin, to=last_date.strftime("%Y-%m-%dT%H:%M:%S"))
+            new_data = _closed_candles(new_data)
+            if new_data.empty:
+                return f"No new data for {coin}."
+            save_coin_data(coin, new_data)
+            return f"Data for {coin} has been updated."
+        # 이전 형식(CSV/단일 파일)은 한 번 전체를 다시 써서 데이터셋으로 변환한다
+        last_date = existing_data['candle_date_time_kst'].max()
+        new_data, complete = _fetch_back_to(coin, new_data, last_date)
+        if new_data is None:
+            return f"Failed to fetch data for {coin}; try again later."
+        if not complete:
+            print(f"Upbit has no candles for {coin} between {last_date:%Y-%m-%d} and the fetched data; the history has a gap.")
+        new_data = _closed_candles(_newer_than(new_data, last_date))
+        save_coin_data(coin, pd.concat([existing_data, new_data], ignore_index=True))
+        return f"Data for {coin} has been updated."
+
+    # 'to'는 해당 시각 이전의 캔들을 반환하므로 최신 캔들을 받아 last_date 이후만 남기고,
+    # 저장된 기록이 200일보다 오래됐으면 last_date까지 거슬러 올라가며 더 받는다
+    last_date, last_price = last_row
+    new_data, complete = _fetch_back_to(coin, new_data, last_date)
+    if new_data is None:
+        return f"Failed to fetch data for {coin}; try again later."
+    if not complete:
+        # 업비트에 실제로 없는 구간: 그 구간을 건너뛴 첫 수익률은 의미가 없으므로 NaN으로 둔다
+        print(f"Upbit has no candles for {coin} between {last_date:%Y-%m-%d} and the fetched data; the history has a gap.")
+        last_price = None
+    new_data = _closed_candles(_newer_than(new_data, last_date))
+
+    if new_data.empty:
+        return f"No new data for {coin}."
+
+    append_coin_data(coin, new_data, last_price)
+    return f"Data for {coin} has been updated."
+
+def _update_one(coin):
+    """Fetch and save any new candles for a single coin."""
+    new_data = fetch_historical_data(coin)
+    return _merge_new_data(coin, new_data)
+
+async def _update_one_async(session, coin):
+    """Async version of _update_one; disk I/O runs in the default executor."""
+    loop = asyncio.get_running_loop()
+    new_data = await _fetch_candles(session, coin)
+    return await loop.run_in_executor(None, _merge_new_data, coin, new_data)
+
+def _report(progress, message):
+    print(message)
+    if progress is not None:
+        progress.put(('coin', message))
+
+async def _gather_all(coins, progress=None, cancel=None):
+    """Update every coin concurrently on a single event loop."""
+    # 동시에 진행하는 코인 수를 제한한다 (취소 여부도 차례가 왔을 때 확인)
+    semaphore = asyncio.Semaphore(ASYNC_CONCURRENCY)
+
+    async def run(coin):
+        async with semaphore:
+            if cancel is not None and cancel.is_set():
+                message = f"Skipped {coin}."
+            else:
+                try:
+                    message = await _update_one_async(session, coin)
+                except Exception as e:
+                    message = f"Failed to update {coin}: {e}"
+        _report(progress, message)
+
+    timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT[0], sock_read=REQUEST_TIMEOUT[1])
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        await asyncio.gather(*(run(coin) for coin in coins))
+
+def update_all_coins(progress=None, cancel=None):
+    """모든 코인의 데이터를 다운로드 및 업데이트하는 함수
+
+    progress: queue.Queue를 넘기면 ('total', 코인 수) 다음에 코인마다 ('coin', 메시지)를 넣는다.
+    cancel: threading.Event가 설정되면 아직 시작하지 않은 코인은 건너뛴다.
+    """
+    coins = fetch_coin_list()
+    _reload_last_dates()
+    if progress is not None:
+        progress.put(('total', len(coins)))
+
+    if aiohttp is not None:
+        asyncio.run(_gather_all(coins, progress, cancel))
+        return
+
+    def run(coin):
+        if cancel is not None and cancel.is_set():
+            return f"Skipped {coin}."
+        return _update_one(coin)
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(run, coin): coin for coin in coins}
+        for future in as_completed(futures):
+            coin = futures[future]
+            try:
+                message = future.result()
+            except Exception as e:
+                message = f"Failed to update {coin}: {e}"
+            _report(progress, message)
 
-            if new_data.empty or 'candle_date_time_kst' not in new_data.columns:
-                print(f"No new data for {coin}.")
-                continue
+def load_saved_coins():
+    """현재 디렉토리의 데이터 파일을 확인하여 저장된 코인 리스트를 반환합니다."""
+    files = os.listdir()
+    # '_data.parquet.old'는 save_coin_data가 중단된 흔적으로, load_coin_data가 복구한다
+    coin_files = {f.rsplit('_data.', 1)[0] for f in files if f.endswith(('_data.parquet', '_data.parquet.old', '_data.csv'))}
+    return sorted(coin_files)
+
+def _load_kernels():
+    """Define _bin_counts/_minmax on first use, with numba if it is installed.
+
+    Importing numba is slow, so headless updates never pay for it.
+    """
+    global numba, _bin_counts, _minmax
+    if _bin_counts is not None:
+        return
+    try:
+        import numba
+    except ImportError:  # numba가 없으면 NumPy로 구간별 개수를 센다
+        numba = None
+
+    if numba is not None:
+        @numba.njit(parallel=True, cache=True)
+        def _bin_counts_kernel(returns, min_r, bin_size, n_bins, n_chunks):
+            chunk = (len(returns) + n_chunks - 1) // n_chunks
+            # 스레드마다 자기 카운트 배열에 쓰고 마지막에 합친다 (경합 없음)
+            local = np.zeros((n_chunks, n_bins), dtype=np.int64)
+            for t in numba.prange(n_chunks):
+                for i in range(t * chunk, min((t + 1) * chunk, len(returns))):
+                    v = returns[i]
+                    if v == v:
+                        k = int(np.floor((v - min_r) / bin_size))
+                        local[t, min(max(k, 0), n_bins - 1)] += 1
+            counts = np.zeros(n_bins, dtype=np.int64)
+            for t in range(n_chunks):
+                counts += local[t]
+            return counts
+
+        @numba.njit(cache=True)
+        def minmax(a):
+            """(min, max) of the non-NaN values in one pass; (inf, -inf) if there are none."""
+            mn = np.inf
+            mx = -np.inf
+            for v in a:
+                if v == v:
+                    if v < mn:
+                        mn = v
+                    if v > mx:
+                        mx = v
+            return mn, mx
+
+        def bin_counts(returns, min_r, bin_size, n_bins):
+            """Count non-NaN returns per bin [min_r + k*bin_size, min_r + (k+1)*bin_size); out-of-range values go to the edge bins."""
+            return _bin_counts_kernel(returns, min_r, bin_size, n_bins, numba.get_num_threads())
+    else:
+        def minmax(a):
+            """(min, max) of the non-NaN values; (inf, -inf) if there are none."""
+            if np.isnan(a).all():
+                return np.inf, -np.inf
+            return np.nanmin(a), np.nanmax(a)
 
-            new_data = new_data[new_data['candle_date_time_kst'] > last_date]
+        def bin_counts(returns, min_r, bin_size, n_bins):
+            """Count non-NaN returns per bin [min_r + k*bin_size, min_r + (k+1)*bin_size); out-of-range values go to the edge bins."""
+            returns = returns[~np.isnan(returns)]
+            idx = np.floor((returns - min_r) / bin_size).astype(np.int64)
+            return np.bincount(np.clip(idx, 0, n_bins - 1), minlength=n_bins)
 
-        if not new_data.empty:
-            updated_data = pd.concat([existing_data, new_data], ignore_index=True)
-            save_coin_data(coin, updated_data)
-            print(f"Data for {coin} has been updated.")
-        else:
-            print(f"No new data for {coin}.")
+    _bin_counts, _minmax = bin_counts, minmax
 
-def load_saved_coins():
-    """현재 디렉토리의 CSV 파일을 확인하여 저장된 코인 리스트를 반환합니다."""
-    files = os.listdir()
-    coin_files = [f.split('_data.csv')[0] for f in files if f.endswith('_data.csv')]
-    return coin_files
+def _pct_returns(prices):
+    """Percent change between consecutive prices (one element shorter than prices)."""
+    return _pct_change(prices[1:], prices[:-1])
 
 def calculate_returns(df):
-    """Calculate daily returns based on closing prices."""
+    """Calculate daily returns (%) based on closing prices, without modifying df."""
+    if 'return' in df.columns:  # save_coin_data에서 이미 계산됨 (첫 행은 NaN)
+        return df['return'].to_numpy()[1:]
     try:
-        df['return'] = df['trade_price'].pct_change() * 100
+        return _pct_returns(df['trade_price'].to_numpy())
     except KeyError:
         print(f"'trade_price' column not found in data. Skipping return calculation.")
-    return df
+        return np.empty(0)
 
 def analyze_periodic_distribution(df, period):
-    """Analyze the periodic return distribution (daily, weekly, or monthly) for a coin."""
-    df['return'] = df['trade_price'].pct_change() * 100  # Calculate daily returns
-
+    """Return the periodic returns (daily, weekly, or monthly, in %) for a coin as an array."""
     if period == 'daily':
-        return df
-    elif period == 'weekly':
-        return df.resample('W-MON', on='candle_date_time_kst').last().pct_change()['trade_price'] * 100
-    elif period == 'monthly':
-        return df.resample('M', on='candle_date_time_kst').last().pct_change()['trade_price'] * 100
-
-class CryptoApp(tk.Tk):
+        return calculate_returns(df)
+    elif period in ('weekly', 'monthly'):
+        key = _period_key(df['candle_date_time_kst'].to_numpy(), period)
+        prices = df['trade_price'].to_numpy()
+        # 날짜순으로 정렬되어 있으므로 key가 바뀌기 직전 행이 각 기간의 마지막 종가
+        is_last = np.append(key[1:] != key[:-1], True)
+        return _pct_returns(prices[is_last])
+    return np.empty(0)
+
+def _period_key(dates, period):
+    """Label each datetime64 with its period: W-MON weeks (Tue..Mon) or calendar months."""
+    days = dates.astype('datetime64[D]')
+    if period == 'weekly':
+        # NumPy의 주 단위는 목요일에 시작하므로 5일 당겨서 화요일 시작 주로 맞춘다
+        return (days - np.timedelta64(5, 'D')).astype('datetime64[W]')
+    return days.astype('datetime64[M]')
+
+def _format_bin(labels, x):
+    """Tick label for the bar at position x (e.g. '-3%', '0%', '+2%')."""
+    i = int(round(x))
+    return labels[i] if 0 <= i < len(labels) else ''
+
+def _import_gui():
+    """Import the Tk/matplotlib stack on first use so headless updates don't load it."""
+    global tk, ttk, messagebox, plt, FigureCanvasTkAgg, FuncFormatter
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.ticker import FuncFormatter
+
+class CryptoApp:
     def __init__(self):
-        super().__init__()
-        self.title("Crypto Return Analysis")
-        self.geometry("800x600")
+        _import_gui()
+        self.root = tk.Tk()
+        self.root.title("Crypto Return Analysis")
+        self.root.geometry("800x600")
 
-        self.download_button = tk.Button(self, text="모든 코인 데이터 다운로드", command=self.download_all_data)
+        self.download_button = tk.Button(self.root, text="모든 코인 데이터 다운로드", command=self.download_all_data)
         self.download_button.pack(pady=10)
 
-        self.coin_label = tk.Label(self, text="코인 선택")
+        self.cancel_button = tk.Button(self.root, text="다운로드 취소", command=self.cancel_download, state='disabled')
+        self.cancel_button.pack()
+
+        self.progress = ttk.Progressbar(self.root, length=300, mode='determinate')
+        self.progress.pack()
+        self.status_label = tk.Label(self.root, text="")
+        self.status_label.pack()
+        self._download_thread = None
+        self._progress_queue = None
+        self._cancel_event = None
+
+        self.coin_label = tk.Label(self.root, text="코인 선택")
         self.coin_label.pack()
 
         self.coin_var = tk.StringVar()
-        self.coin_dropdown = ttk.Combobox(self, textvariable=self.coin_var)
+        self.coin_dropdown = ttk.Combobox(self.root, textvariable=self.coin_var)
         self.coin_dropdown.pack()
 
-        self.period_label = tk.Label(self, text="주기 선택 (일별, 주별, 월별)")
+        self.period_label = tk.Label(self.root, text="주기 선택 (일별, 주별, 월별)")
         self.period_label.pack()
 
         self.period_var = tk.StringVar()
-        self.period_dropdown = ttk.Combobox(self, textvariable=self.period_var, values=['daily', 'weekly', 'monthly'])
+        self.period_dropdown = ttk.Combobox(self.root, textvariable=self.period_var, values=['daily', 'weekly', 'monthly'])
         self.period_dropdown.pack()
 
-        self.analyze_button = tk.Button(self, text="분석 및 시각화", command=self.analyze_and_visualize)
+        self.analyze_button = tk.Button(self.root, text="분석 및 시각화", command=self.analyze_and_visualize)
         self.analyze_button.pack(pady=10)
 
         self.fig, self.ax = plt.subplots(figsize=(8, 6))
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
         self.canvas.get_tk_widget().pack()
 
+        # 구간이 같으면 막대를 다시 만들지 않고 높이만 바꿔 blit한다
+        self._bars = None
+        self._bins = None
+        self._title = None
+        self._background = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
         self.update_coin_list()
 
+    def mainloop(self):
+        self.root.mainloop()
+
     def download_all_data(self):
-        update_all_coins()
-        self.update_coin_list()
-        messagebox.showinfo("완료", "모든 코인의 데이터가 성공적으로 다운로드되었습니다.")
+        """Start the download on a background thread so the window stays responsive."""
+        if self._download_thread is not None and self._download_thread.is_alive():
+            return
+        self._progress_queue = queue.Queue()
+        self._cancel_event = threading.Event()
+        self.progress['value'] = 0
+        self.status_label['text'] = "코인 목록을 가져오는 중..."
+        self.download_button['state'] = 'disabled'
+        self.cancel_button['state'] = 'normal'
+
+        self._download_thread = threading.Thread(
+            target=self._run_update, args=(self._progress_queue, self._cancel_event), daemon=True)
+        self._download_thread.start()
+        self.root.after(100, self._drain_queue)
+
+    def cancel_download(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self.status_label['text'] = "취소하는 중..."
+
+    def _run_update(self, q, cancel):
+        # 이 스레드에서는 Tk를 건드리지 않고 큐로만 알린다
+        try:
+            update_all_coins(q, cancel)
+        except Exception as e:
+            q.put(('error', str(e)))
+        else:
+            q.put(('done', None))
+
+    def _drain_queue(self):
+        """Apply queued progress messages on the Tk thread; reschedules itself until the download ends."""
+        while True:
+            try:
+                kind, payload = self._progress_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == 'total':
+                self.progress['maximum'] = max(payload, 1)
+            elif kind == 'coin':
+                self.progress['value'] += 1
+                self.status_label['text'] = payload
+            else:
+                self.download_button['state'] = 'normal'
+                self.cancel_button['state'] = 'disabled'
+                if kind == 'error':
+                    self.status_label['text'] = ""
+                    messagebox.showerror("다운로드 오류", payload)
+                    return
+                self.update_coin_list()
+                if self._cancel_event.is_set():
+                    self.status_label['text'] = "다운로드가 취소되었습니다."
+                else:
+                    self.status_label['text'] = ""
+                    messagebox.showinfo("완료", "모든 코인의 데이터가 성공적으로 다운로드되었습니다.")
+                return
+
+        self.root.after(100, self._drain_queue)
 
     def update_coin_list(self):
         coins = load_saved_coins()
@@ -159,22 +793,24 @@ class CryptoApp(tk.Tk):
         else:
             messagebox.showwarning("경고", "저장된 코인 데이터가 없습니다. 먼저 데이터를 다운로드하세요.")
 
-    def calculate_distribution(self, df, bin_size=1):
+    def calculate_distribution(self, returns, bin_size=1):
         """Calculate return distribution with fixed bin size."""
-        if 'return' not in df.columns:
-            print("No 'return' column found.")
+        _load_kernels()
+        min_return, max_return = _minmax(returns)
+        if min_return > max_return:  # 유효한 수익률이 없음
             return pd.Series()
 
-        min_return = math.floor(df['return'].min() / bin_size) * bin_size
-        max_return = math.ceil(df['return'].max() / bin_size) * bin_size
-
-        bins = np.arange(min_return, max_return + bin_size, bin_size)
-
-        distribution, _ = np.histogram(df['return'], bins=bins, density=True)
-        distribution = distribution * 100 * bin_size
-
-        labels = [f"{b:.0f}%" if b == 0 else f"{b:+.0f}%" for b in bins[:-1]]
-
+        # np.histogram과 같은 구간: 마지막 구간은 오른쪽 끝을 포함하므로 최댓값이
+        # 경계에 딱 걸리면 새 구간을 만들지 않고 마지막 구간에 넣는다 (커널이 클램프)
+        lowest = int(np.floor(min_return / bin_size))
+        n_bins = max(int(np.ceil(max_return / bin_size)) - lowest, 1)
+        counts = _bin_counts(returns, lowest * bin_size, bin_size, n_bins)
+        distribution = counts / counts.sum() * 100
+
+        # 구간 하한값 라벨을 한 번에 만든다: -3%, +2%, 0은 부호 없이 0%
+        bins = ((lowest + np.arange(len(counts))) * bin_size).astype(np.int64)
+        labels = np.char.mod('%+d%%', bins)
+        labels[bins == 0] = '0%'
         return pd.Series(distribution, index=labels)
 
     def analyze_and_visualize(self):
@@ -191,22 +827,52 @@ class CryptoApp(tk.Tk):
             messagebox.showerror("데이터 오류", f"{selected_coin}의 데이터를 찾을 수 없습니다.")
             return
     
-        df = analyze_periodic_distribution(df, selected_period)
+        returns = analyze_periodic_distribution(df, selected_period)
     
-        if df.empty:
+        if returns.size == 0:
             messagebox.showerror("데이터 오류", f"{selected_coin}의 {selected_period} 데이터를 찾을 수 없습니다.")
             return
     
+        title = f'{selected_coin} {selected_period.capitalize()} Return Distribution'
+        distribution = self.calculate_distribution(returns)
+
+        if not self._update_bars(title, distribution):
+            self._draw_distribution(title, distribution)
+
+    def _update_bars(self, title, distribution):
+        """Reuse the existing bars when the bins are unchanged; returns False if a full redraw is needed."""
+        if self._bars is None or distribution.empty or not np.array_equal(distribution.index.to_numpy(), self._bins):
+            return False
+        top = self.ax.get_ylim()[1]
+        highest = distribution.values.max()
+        if highest > top or highest < top / 2:  # y축 눈금이 바뀌어야 하면 전체를 다시 그린다
+            return False
+
+        for rect, h in zip(self._bars, distribution.values):
+            rect.set_height(h)
+        self._title.set_text(title)
+        self.canvas.restore_region(self._background)
+        self._draw_animated()
+        self.canvas.blit(self.fig.bbox)
+        return True
+
+    def _draw_distribution(self, title, distribution):
+        self._bars = None
         self.ax.clear()
-        self.ax.set_title(f'{selected_coin} {selected_period.capitalize()} Return Distribution')
-    
-        distribution = self.calculate_distribution(df)
+        self._title = self.ax.set_title(title)
     
         if not distribution.empty:
-            self.ax.bar(distribution.index, distribution.values, width=0.8, align='center', color="blue", alpha=0.7)
-            self.ax.set_xticks(range(len(distribution.index)))
-            self.ax.set_xticklabels(distribution.index, rotation=45, ha='right', fontsize=6)  # 수정된 부분
+            labels = distribution.index.to_numpy()
+            self._bars = self.ax.bar(range(len(labels)), distribution.values, width=0.8, align='center', color="blue", alpha=0.7)
+            self._bins = labels
+            self.ax.set_xticks(range(len(labels)))
+            self.ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: _format_bin(labels, x)))
+            self.ax.tick_params(axis='x', which='major', labelrotation=45, labelsize=6)  # 수정된 부분
+            plt.setp(self.ax.get_xticklabels(), ha='right')
             self.ax.tick_params(axis='x', which='major', pad=0)  # x축 레이블과 축 사이의 간격 조정
+            # 막대와 제목은 배경에서 빼고 _on_draw/_update_bars에서 따로 그린다
+            for artist in (self._title, *self._bars):
+                artist.set_animated(True)
         else:
             self.ax.text(0.5, 0.5, '데이터 없음', horizontalalignment='center', verticalalignment='center', transform=self.ax.transAxes)
     
@@ -218,6 +884,27 @@ class CryptoApp(tk.Tk):
         plt.tight_layout()  # 그래프 레이아웃 자동 조정
         self.canvas.draw()
 
+    def _on_draw(self, event):
+        """After every full draw, keep a copy of the background and paint the animated artists on top."""
+        if self._bars is None:
+            return
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        self.ax.draw_artist(self._title)
+        for rect in self._bars:
+            self.ax.draw_artist(rect)
+
 if __name__ == "__main__":
-    app = CryptoApp()
-    app.mainloop()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Upbit KRW 코인 수익률 분포 분석")
+    parser.add_argument('--update', action='store_true', help="GUI 없이 모든 코인 데이터를 다운로드/업데이트")
+    args = parser.parse_args()
+
+    if args.update:
+        update_all_coins()
+    else:
+        app = CryptoApp()
+        app.mainloop()